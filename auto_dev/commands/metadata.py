@@ -240,10 +240,8 @@ def build_dependency_tree_for_metadata_components(component: str) -> dict:
         Dictionary mapping dependency types to sets of dependencies
 
     """
-    component_type = component.split("/")[0]
-    component_author = component.split("/")[1]
-    component_name = component.split("/")[2]
-    public_id = PublicId(component_author, component_name.split(":")[0])
+    component_type, component_author, component_name, *_ = component.split("/")
+    public_id = PublicId(component_author, component_name.partition(":")[0])
     component_path = f"packages/{public_id.author}/{component_type}s/{public_id.name}"
 
     wanted_keys = [
@@ -302,8 +300,9 @@ def validate(ctx, metadata_file) -> None:
 
 def render_metadata(metadata, verbose=False) -> bool:
     """Render metadata for a package."""
-    self_component = Dependency.from_str("/".join(metadata["name"].split("/")[1:]))
-    self_component.component_type = metadata["name"].split("/")[0]
+    component_type, _, component_public_id = metadata["name"].partition("/")
+    self_component = Dependency.from_str(component_public_id)
+    self_component.component_type = component_type
 
     self_component_status, self_component_id = check_component_status(
         PackageId.from_uri_path(metadata["name"].replace(":", "/"))
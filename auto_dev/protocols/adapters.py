@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import re
+from typing import Any
 from functools import cached_property
 from dataclasses import field, dataclass
 
@@ -36,6 +37,8 @@ class MessageAdapter:
     extensions: list[ast.Extension] = field(default_factory=list)
     map_fields: list[ast.MapField] = field(default_factory=list)
 
+    resolved_types: dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+
     def __getattr__(self, name: str):
         """Access wrapped ast.Message instance attributes."""
 
@@ -103,6 +106,8 @@ class FileAdapter:
     services: list[ast.Service] = field(default_factory=list)
     comments: list[ast.Comment] = field(default_factory=list)
 
+    resolved_types: dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+
     def __getattr__(self, name: str):
         """Access wrapped ast.File instance attributes."""
 
@@ -2,6 +2,7 @@
 
 import textwrap
 from typing import NamedTuple
+from functools import cache
 
 from proto_schema_parser import ast
 from proto_schema_parser.ast import (
@@ -39,8 +40,14 @@ class ResolvedType(NamedTuple):
 
 
 def resolve_type(adapter: FileAdapter | MessageAdapter, type_name: str) -> ResolvedType:
-    """Fully qualified type for a type reference."""
+    """Fully qualified type for a type reference, memoized per adapter scope."""
 
+    if (resolved := adapter.resolved_types.get(type_name)) is None:
+        resolved = adapter.resolved_types[type_name] = _resolve_type(adapter, type_name)
+    return resolved
+
+
+def _resolve_type(adapter: FileAdapter | MessageAdapter, type_name: str) -> ResolvedType:
     if (scalar_type := PRIMITIVE_TYPE_MAP.get(type_name)) is not None:
         return ResolvedType(scalar_type)
 
@@ -60,58 +67,90 @@ def resolve_type(adapter: FileAdapter | MessageAdapter, type_name: str) -> Resol
             raise TypeError(msg)
 
 
-def render_field(field: Field, message: MessageAdapter) -> str:
-    """Render Field."""
-
-    resolved_type = resolve_type(message, field.type)
-    match field.cardinality:
+@cache
+def _render_field_type(type_str: str, cardinality: FieldCardinality | None) -> str:
+    match cardinality:
         case FieldCardinality.REQUIRED | None:
-            return f"{resolved_type}"
+            return type_str
         case FieldCardinality.OPTIONAL:
-            return f"Optional[{resolved_type}] = None"
+            return f"Optional[{type_str}] = None"
         case FieldCardinality.REPEATED:
-            return f"list[{resolved_type}]"
+            return f"list[{type_str}]"
         case _:
-            msg = f"Unexpected cardinality: {field.cardinality}"
+            msg = f"Unexpected cardinality: {cardinality}"
             raise TypeError(msg)
 
 
+def render_field(field: Field, message: MessageAdapter) -> str:
+    """Render Field."""
+
+    resolved_type = resolve_type(message, field.type)
+    return _render_field_type(str(resolved_type), field.cardinality)
+
+
+def _render_comment(element: ast.Comment, *_) -> str:
+    return f"# {element.text}"
+
+
+def _render_field_element(element: ast.Field, message: MessageAdapter) -> str:
+    return f"{element.name}: {render_field(element, message)}"
+
+
+def _render_oneof(element: ast.OneOf, message: MessageAdapter) -> str:
+    if not all(isinstance(e, Field) for e in element.elements):
+        msg = "Only implemented OneOf for Field"
+        raise NotImplementedError(msg)
+    inner = " | ".join([render_field(e, message) for e in element.elements])
+    return f"{element.name}: {inner}"
+
+
+def _render_message(element: MessageAdapter, _message: MessageAdapter) -> str:
+    nested, flat = [], []
+    for e in element.elements:
+        (nested if isinstance(e, MessageAdapter | ast.Enum) else flat).append(e)
+    inner = "\n".join(render_attribute(e, element) for e in nested + flat)
+    encoder = render_encoder(element)
+    decoder = render_decoder(element)
+    body = f"{inner}\n\n{encoder}\n\n{decoder}"
+    indented_body = textwrap.indent(body, "    ")
+    return f"\nclass {element.name}(BaseModel):\n" f'    """{element.name}"""\n\n' f"{indented_body}\n"
+
+
+def _render_enum(element: ast.Enum, _message: MessageAdapter) -> str:
+    members = "\n".join([f"{val.name} = {val.number}" for val in element.elements])
+    indented_members = textwrap.indent(members, "    ")
+    return f"class {element.name}(IntEnum):\n" f'    """{element.name}"""\n\n' f"{indented_members}\n"
+
+
+def _render_map_field(element: ast.MapField, message: MessageAdapter) -> str:
+    value_type = resolve_type(message, element.value_type)
+    key_type = PRIMITIVE_TYPE_MAP.get(element.key_type, element.key_type)
+    return f"{element.name}: dict[{key_type}, {value_type}]"
+
+
+_ATTRIBUTE_RENDERERS = {
+    ast.Comment: _render_comment,
+    ast.Field: _render_field_element,
+    ast.OneOf: _render_oneof,
+    adapters.MessageAdapter: _render_message,
+    ast.Enum: _render_enum,
+    ast.MapField: _render_map_field,
+}
+
+_UNSUPPORTED_ELEMENTS = frozenset({ast.Group, ast.Option, ast.ExtensionRange, ast.Reserved, ast.Extension})
+
+
 def render_attribute(element: MessageElement | MessageAdapter, message: MessageAdapter) -> str:
     """Render message elements."""
 
-    match type(element):
-        case ast.Comment:
-            return f"# {element.text}"
-        case ast.Field:
-            return f"{element.name}: {render_field(element, message)}"
-        case ast.OneOf:
-            if not all(isinstance(e, Field) for e in element.elements):
-                msg = "Only implemented OneOf for Field"
-                raise NotImplementedError(msg)
-            inner = " | ".join(render_field(e, message) for e in element.elements)
-            return f"{element.name}: {inner}"
-        case adapters.MessageAdapter:
-            elements = sorted(element.elements, key=lambda e: not isinstance(e, MessageAdapter | ast.Enum))
-            body = inner = "\n".join(render_attribute(e, element) for e in elements)
-            encoder = render_encoder(element)
-            decoder = render_decoder(element)
-            body = f"{inner}\n\n{encoder}\n\n{decoder}"
-            indented_body = textwrap.indent(body, "    ")
-            return f"\nclass {element.name}(BaseModel):\n" f'    """{element.name}"""\n\n' f"{indented_body}\n"
-        case ast.Enum:
-            members = "\n".join(f"{val.name} = {val.number}" for val in element.elements)
-            indented_members = textwrap.indent(members, "    ")
-            return f"class {element.name}(IntEnum):\n" f'    """{element.name}"""\n\n' f"{indented_members}\n"
-        case ast.MapField:
-            key_type = PRIMITIVE_TYPE_MAP.get(element.key_type, element.key_type)
-            value_type = resolve_type(message, element.value_type)
-            return f"{element.name}: dict[{key_type}, {value_type}]"
-        case ast.Group | ast.Option | ast.ExtensionRange | ast.Reserved | ast.Extension:
-            msg = f"{element}"
-            raise NotImplementedError(msg)
-        case _:
-            msg = f"Unexpected message type: {element}"
-            raise TypeError(msg)
+    element_type = type(element)
+    if (renderer := _ATTRIBUTE_RENDERERS.get(element_type)) is not None:
+        return renderer(element, message)
+    if element_type in _UNSUPPORTED_ELEMENTS:
+        msg = f"{element}"
+        raise NotImplementedError(msg)
+    msg = f"Unexpected message type: {element}"
+    raise TypeError(msg)
 
 
 def render(file: FileAdapter):
@@ -123,70 +162,107 @@ def render(file: FileAdapter):
     return f"{enums}\n{messages}"
 
 
-def encode_field(element, message):
+_ENCODE_SCALAR = {
+    FieldCardinality.REPEATED: "proto_obj.{name}.extend({attr})",
+    FieldCardinality.OPTIONAL: "if {attr} is not None:\n    proto_obj.{name} = {attr}",
+    FieldCardinality.REQUIRED: "proto_obj.{name} = {attr}",
+    None: "proto_obj.{name} = {attr}",
+}
+
+_ENCODE_MESSAGE = {
+    FieldCardinality.REPEATED: "for item in {attr}:\n    {type}.encode(proto_obj.{name}.add(), item)",
+    FieldCardinality.OPTIONAL: (
+        "if {attr} is not None:\n    proto_obj.{name}.SetInParent()\n    {type}.encode(proto_obj.{name}, {attr})"
+    ),
+    FieldCardinality.REQUIRED: "{type}.encode(proto_obj.{name}, {attr})",
+    None: "{type}.encode(proto_obj.{name}, {attr})",
+}
+
+_DECODE_SCALAR = {
+    FieldCardinality.REPEATED: "{name} = list(proto_obj.{name})",
+    FieldCardinality.OPTIONAL: (
+        '{name} = proto_obj.{name} if proto_obj.{name} is not None and proto_obj.HasField("{name}") else None'
+    ),
+    FieldCardinality.REQUIRED: "{name} = proto_obj.{name}",
+    None: "{name} = proto_obj.{name}",
+}
+
+_DECODE_MESSAGE = {
+    FieldCardinality.REPEATED: "{name} = [{type}.decode(item) for item in proto_obj.{name}]",
+    FieldCardinality.OPTIONAL: (
+        "{name} = {type}.decode(proto_obj.{name}) "
+        'if proto_obj.{name} is not None and proto_obj.HasField("{name}") else None'
+    ),
+    FieldCardinality.REQUIRED: "{name} = {type}.decode(proto_obj.{name})",
+    None: "{name} = {type}.decode(proto_obj.{name})",
+}
+
+
+def _field_template(templates: dict, field: ast.Field) -> str:
+    if (template := templates.get(field.cardinality)) is None:
+        msg = f"Unexpected cardinality: {field.cardinality}"
+        raise TypeError(msg)
+    return template
+
+
+def encode_field(element, message, instance_name: str | None = None):
     """Render pydantic model field encoding."""
 
-    instance_attr = f"{message.name.lower()}.{element.name}"
+    instance_name = instance_name or message.name.lower()
     resolved_type = resolve_type(message, element.type)
-    if element.type in PRIMITIVE_TYPE_MAP or resolved_type.is_enum:
-        value = instance_attr
-    else:  # Message
-        if element.cardinality == FieldCardinality.REPEATED:
-            return f"for item in {instance_attr}:\n" f"    {resolved_type}.encode(proto_obj.{element.name}.add(), item)"
-        if element.cardinality == FieldCardinality.OPTIONAL:
-            return (
-                f"if {instance_attr} is not None:\n"
-                f"    temp = proto_obj.{element.name}.__class__()\n"
-                f"    {resolved_type}.encode(temp, {instance_attr})\n"
-                f"    proto_obj.{element.name}.CopyFrom(temp)"
-            )
-        return f"{resolved_type}.encode(proto_obj.{element.name}, {instance_attr})"
-
-    match element.cardinality:
-        case FieldCardinality.REPEATED:
-            iter_items = f"for item in {value}:\n"
-            return f"{iter_items}    proto_obj.{element.name}.append(item)"
-        case FieldCardinality.OPTIONAL:
-            return f"if {instance_attr} is not None:\n    proto_obj.{element.name} = {instance_attr}"
-        case _:
-            return f"proto_obj.{element.name} = {value}"
+    is_scalar = element.type in PRIMITIVE_TYPE_MAP or resolved_type.is_enum
+    template = _field_template(_ENCODE_SCALAR if is_scalar else _ENCODE_MESSAGE, element)
+    return template.format(name=element.name, attr=f"{instance_name}.{element.name}", type=resolved_type)
+
+
+def _encode_oneof(element: ast.OneOf, _message: MessageAdapter, instance_name: str) -> str:
+    instance_attr = f"{instance_name}.{element.name}"
+    primitive_type = PRIMITIVE_TYPE_MAP.get
+    return "\n".join(
+        [
+            f"if isinstance({instance_attr}, {primitive_type(e.type, e.type)}):\n    proto_obj.{e.name} = {instance_attr}"
+            for e in element.elements
+        ]
+    )
+
+
+def _encode_map_field(element: ast.MapField, message: MessageAdapter, instance_name: str) -> str:
+    iter_items = f"for key, value in {instance_name}.{element.name}.items():\n    "
+    proto_item = f"proto_obj.{element.name}[key]"
+    if element.value_type in PRIMITIVE_TYPE_MAP:
+        return f"{iter_items}{proto_item} = value"
+    if element.value_type in message.file.enums_by_name:
+        return f"{iter_items}{proto_item} = {element.value_type}(value)"
+    if element.value_type in message.enums_by_name:
+        return f"{iter_items}{proto_item} = {message.name}.{element.value_type}(value)"
+    return f"{iter_items}{resolve_type(message, element.value_type)}.encode({proto_item}, value)"
+
+
+_ENCODERS = {
+    ast.Comment: _render_comment,
+    ast.Field: encode_field,
+    ast.OneOf: _encode_oneof,
+    ast.MapField: _encode_map_field,
+}
 
 
 def render_encoder(message: MessageAdapter) -> str:
     """Render pydantic model .encode() method."""
 
+    instance_name = message.name.lower()
+
     def encode_element(element) -> str:
-        match type(element):
-            case ast.Comment:
-                return f"# {element.text}"
-            case ast.Field:
-                return encode_field(element, message)
-            case ast.OneOf:
-                return "\n".join(
-                    f"if isinstance({message.name.lower()}.{element.name}, {PRIMITIVE_TYPE_MAP.get(e.type, e.type)}):\n    proto_obj.{e.name} = {message.name.lower()}.{element.name}"
-                    for e in element.elements
-                )
-            case ast.MapField:
-                iter_items = f"for key, value in {message.name.lower()}.{element.name}.items():"
-                if element.value_type in PRIMITIVE_TYPE_MAP:
-                    return f"{iter_items}\n    proto_obj.{element.name}[key] = value"
-                if element.value_type in message.file.enums_by_name:
-                    return f"{iter_items}\n    proto_obj.{element.name}[key] = {element.value_type}(value)"
-                if element.value_type in message.enums_by_name:
-                    return (
-                        f"{iter_items}\n    proto_obj.{element.name}[key] = {message.name}.{element.value_type}(value)"
-                    )
-                return f"{iter_items}\n    {resolve_type(message, element.value_type)}.encode(proto_obj.{element.name}[key], value)"
-            case _:
-                msg = f"Unexpected message type: {element}"
-                raise TypeError(msg)
+        if (encoder := _ENCODERS.get(type(element))) is None:
+            msg = f"Unexpected message type: {element}"
+            raise TypeError(msg)
+        return encoder(element, message, instance_name)
 
     elements = filter(lambda e: not isinstance(e, MessageAdapter | ast.Enum), message.elements)
     inner = "\n".join(map(encode_element, elements))
     indented_inner = textwrap.indent(inner, "    ")
     return (
         "@staticmethod\n"
-        f"def encode(proto_obj, {message.name.lower()}: {message.name}) -> None:\n"
+        f"def encode(proto_obj, {instance_name}: {message.name}) -> None:\n"
         f'    """Encode {message.name} to protobuf."""\n\n'
         f"{indented_inner}\n"
     )
@@ -195,75 +271,58 @@ def render_encoder(message: MessageAdapter) -> str:
 def decode_field(field: ast.Field, message: MessageAdapter) -> str:
     """Render pydantic model field decoding."""
 
-    instance_field = f"proto_obj.{field.name}"
     resolved_type = resolve_type(message, field.type)
-    if field.type in PRIMITIVE_TYPE_MAP or resolved_type.is_enum:
-        value = instance_field
-    else:
-        resolved_type = resolve_type(message, field.type)
-        if field.cardinality == FieldCardinality.REPEATED:
-            return f"{field.name} = [{resolved_type}.decode(item) for item in {instance_field}]"
-        if field.cardinality == FieldCardinality.OPTIONAL:
-            return (
-                f"{field.name} = {resolved_type}.decode({instance_field}) "
-                f'if {instance_field} is not None and proto_obj.HasField("{field.name}") '
-                f"else None"
-            )
-        return f"{field.name} = {resolved_type}.decode({instance_field})"
-
-    match field.cardinality:
-        case FieldCardinality.REPEATED:
-            return f"{field.name} = list({value})"
-        case FieldCardinality.OPTIONAL:
-            return (
-                f"{field.name} = {value} "
-                f'if {instance_field} is not None and proto_obj.HasField("{field.name}") '
-                f"else None"
-            )
-        case FieldCardinality.REQUIRED | None:
-            return f"{field.name} = {value}"
-        case _:
-            msg = f"Unexpected cardinality: {field.cardinality}"
-            raise TypeError(msg)
+    is_scalar = field.type in PRIMITIVE_TYPE_MAP or resolved_type.is_enum
+    template = _field_template(_DECODE_SCALAR if is_scalar else _DECODE_MESSAGE, field)
+    return template.format(name=field.name, type=resolved_type)
+
+
+def _decode_oneof(element: ast.OneOf, _message: MessageAdapter) -> str:
+    return "\n".join(
+        [f'if proto_obj.HasField("{e.name}"):\n    {element.name} = proto_obj.{e.name}' for e in element.elements]
+    )
+
+
+def _decode_map_field(element: ast.MapField, message: MessageAdapter) -> str:
+    proto_attr = f"proto_obj.{element.name}"
+    if element.value_type in PRIMITIVE_TYPE_MAP:
+        return f"{element.name} = dict({proto_attr})"
+    iter_items = f"{element.name} = {{}}\nfor key, value in {proto_attr}.items():\n    {element.name}[key]"
+    if element.value_type in message.file.enums_by_name:
+        return f"{iter_items} = {element.value_type}(value)"
+    if element.value_type in message.enums_by_name:
+        return f"{iter_items} = {message.name}.{element.value_type}(value)"
+    return (
+        f"{element.name} = {{ key: {resolve_type(message, element.value_type)}.decode(item) "
+        f"for key, item in {proto_attr}.items() }}"
+    )
+
+
+_DECODERS = {
+    ast.Comment: _render_comment,
+    ast.Field: decode_field,
+    ast.OneOf: _decode_oneof,
+    ast.MapField: _decode_map_field,
+}
 
 
 def render_decoder(message: MessageAdapter) -> str:
     """Render pydantic model .decode() method."""
 
-    def decode_element(element) -> str:
-        match type(element):
-            case ast.Comment:
-                return f"# {element.text}"
-            case ast.Field:
-                return decode_field(element, message)
-            case ast.OneOf:
-                return "\n".join(
-                    f'if proto_obj.HasField("{e.name}"):\n    {element.name} = proto_obj.{e.name}'
-                    for e in element.elements
-                )
-            case ast.MapField:
-                iter_items = f"{element.name} = {{}}\nfor key, value in proto_obj.{element.name}.items():"
-                if element.value_type in PRIMITIVE_TYPE_MAP:
-                    return f"{element.name} = dict(proto_obj.{element.name})"
-                if element.value_type in message.file.enums_by_name:
-                    return f"{iter_items}\n    {element.name}[key] = {element.value_type}(value)"
-                if element.value_type in message.enums_by_name:
-                    return f"{iter_items}\n    {element.name}[key] = {message.name}.{element.value_type}(value)"
-                return (
-                    f"{element.name} = {{ key: {resolve_type(message, element.value_type)}.decode(item) "
-                    f"for key, item in proto_obj.{element.name}.items() }}"
-                )
-            case _:
-                msg = f"Unexpected message element type: {element}"
-                raise TypeError(msg)
-
-    def constructor_kwargs(elements) -> str:
-        types = (ast.Field, ast.MapField, ast.OneOf)
-        return ",\n    ".join(f"{e.name}={e.name}" for e in elements if isinstance(e, types))
-
-    constructor = f"return cls(\n    {constructor_kwargs(message.elements)}\n)"
-    elements = filter(lambda e: not isinstance(e, MessageAdapter | ast.Enum), message.elements)
-    inner = "\n".join(map(decode_element, elements)) + f"\n\n{constructor}"
+    body, kwargs = [], []
+    for element in message.elements:
+        if isinstance(element, MessageAdapter | ast.Enum):
+            continue
+        if (decoder := _DECODERS.get(type(element))) is None:
+            msg = f"Unexpected message element type: {element}"
+            raise TypeError(msg)
+        body.append(decoder(element, message))
+        if isinstance(element, ast.Field | ast.MapField | ast.OneOf):
+            kwargs.append(f"{element.name}={element.name}")
+
+    constructor_kwargs = ",\n    ".join(kwargs)
+    constructor = f"return cls(\n    {constructor_kwargs}\n)"
+    inner = "\n".join(body) + f"\n\n{constructor}"
     indented_inner = textwrap.indent(inner, "    ")
     return (
         "@classmethod\n"
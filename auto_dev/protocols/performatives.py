@@ -1,5 +1,8 @@
 """Module for parsing protocol performatives."""
 
+from functools import lru_cache
+
+
 SCALAR_MAP = {
     "int": "conint(ge=Int32.min(), le=Int32.max())",
     "float": "confloat(ge=Double.min(), le=Double.max())",
@@ -8,49 +11,112 @@ SCALAR_MAP = {
     "bytes": "bytes",
 }
 
+CONTAINER_MAP = {
+    "optional": lambda args: f"Optional[{args[0]}]",
+    "list": lambda args: f"tuple[{args[0]}]",  # quirk of the framework!
+    "dict": lambda args: f"dict[{args[0]}, {args[1]}]",
+    "union": " | ".join,
+}
+
+# (minimum, maximum) number of arguments each container takes; None means unbounded
+CONTAINER_ARITY = {
+    "optional": (1, 1),
+    "list": (1, 1),
+    "dict": (2, 2),
+    "union": (2, None),
+}
+
+_DELIMITERS = frozenset("[],")
+
+
+def _tokenize(annotation: str) -> list[str]:
+    """Split an annotation into type identifiers and the delimiters `[`, `,` and `]`."""
 
-def _split_top_level(s: str, sep: str = ",") -> list[str]:
-    parts = []
+    tokens = []
     current = []
-    depth = 0
-    for c in s:
-        if c == "[":
-            depth += 1
-        elif c == "]":
-            depth -= 1
-        if c == sep and depth == 0:
-            parts.append("".join(current).strip())
+    for c in annotation:
+        if c in _DELIMITERS:
+            if ident := "".join(current).strip():
+                tokens.append(ident)
+            tokens.append(c)
             current = []
         else:
             current.append(c)
-    if current:
-        parts.append("".join(current).strip())
-    return parts
+    if ident := "".join(current).strip():
+        tokens.append(ident)
+    return tokens
+
+
+def _parse_type(ident: str, annotation: str) -> tuple[str, bool]:
+    """Strip the `pt:`/`ct:` prefix, returning the type name and whether it is a custom type."""
 
+    if ident.startswith("pt:"):
+        return ident[3:], False
+    if ident.startswith("ct:"):
+        return ident[3:], True
+    msg = f"Unknown annotation prefix in: {annotation}"
+    raise ValueError(msg)
 
+
+def _check_token_position(token: str, previous: str | None, annotation: str) -> None:
+    """Reject a token that cannot follow the previous one, such as an empty argument."""
+
+    if token == "[":
+        # a valid `[` follows the container identifier that its look-ahead pushed on the stack
+        if previous is None or previous in _DELIMITERS:
+            msg = f"Unexpected '[' in: {annotation}"
+            raise ValueError(msg)
+    elif token in {",", "]"}:
+        if previous in {"[", ","}:
+            msg = f"Empty argument in: {annotation}"
+            raise ValueError(msg)
+    elif previous not in {None, "[", ","}:
+        msg = f"Missing ',' before {token!r} in: {annotation}"
+        raise ValueError(msg)
+
+
+@lru_cache(maxsize=256)
 def parse_annotation(annotation: str) -> str:
     """Parse Performative annotation."""
 
-    if annotation.startswith("pt:"):
-        core = annotation[3:]
-    elif annotation.startswith("ct:"):
-        return annotation[3:]
-    else:
-        msg = f"Unknown annotation prefix in: {annotation}"
-        raise ValueError(msg)
+    tokens = _tokenize(annotation)
+    stack: list[tuple[str, list[str]]] = []
+    result: list[str] = []
+    for i, token in enumerate(tokens):
+        _check_token_position(token, tokens[i - 1] if i else None, annotation)
+        if token in {"[", ","}:
+            if token == "," and not stack:
+                msg = f"Malformed annotation: {annotation}"
+                raise ValueError(msg)
+            continue
+        if token == "]":
+            if not stack:
+                msg = f"Unbalanced brackets in: {annotation}"
+                raise ValueError(msg)
+            container, container_args = stack.pop()
+            min_args, max_args = CONTAINER_ARITY[container]
+            if len(container_args) < min_args or (max_args is not None and len(container_args) > max_args):
+                msg = f"Wrong number of arguments for {container!r} in: {annotation}"
+                raise ValueError(msg)
+            (stack[-1][1] if stack else result).append(CONTAINER_MAP[container](container_args))
+            continue
+
+        args = stack[-1][1] if stack else result
+        name, is_custom = _parse_type(token, annotation)
+        if i + 1 < len(tokens) and tokens[i + 1] == "[":
+            if is_custom or name not in CONTAINER_MAP:
+                msg = f"Unknown container type {name!r} in: {annotation}"
+                raise ValueError(msg)
+            stack.append((name, []))
+        elif is_custom:
+            args.append(name)
+        elif (scalar := SCALAR_MAP.get(name)) is not None:
+            args.append(scalar)
+        else:
+            msg = f"Unknown scalar {name!r} in: {annotation}"
+            raise ValueError(msg)
 
-    if core.startswith("optional[") and core.endswith("]"):
-        inner = core[len("optional[") : -1]
-        return f"Optional[{parse_annotation(inner)}]"
-    if core.startswith("list[") and core.endswith("]"):
-        inner = core[len("list[") : -1]
-        return f"tuple[{parse_annotation(inner)}]"  # quirk of the framework!
-    if core.startswith("dict[") and core.endswith("]"):
-        inner = core[len("dict[") : -1]
-        key_str, value_str = _split_top_level(inner)
-        return f"dict[{parse_annotation(key_str)}, {parse_annotation(value_str)}]"
-    if core.startswith("union[") and core.endswith("]"):
-        inner = core[len("union[") : -1]
-        parts = _split_top_level(inner)
-        return " | ".join(parse_annotation(p) for p in parts)
-    return SCALAR_MAP[core]
+    if stack or len(result) != 1:
+        msg = f"Malformed annotation: {annotation}"
+        raise ValueError(msg)
+    return result[0]
@@ -3,13 +3,15 @@
 from __future__ import annotations
 
 import re
-import inspect
+import shutil
 import subprocess  # nosec: B404
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Annotated
 from pathlib import Path
+from functools import cache, lru_cache
+from collections import defaultdict
 
-from jinja2 import Template, Environment, FileSystemLoader
-from pydantic import BaseModel, ConfigDict
+from jinja2 import Template, Environment, FileSystemLoader, FileSystemBytecodeCache
+from pydantic import BaseModel, ConfigDict, StringConstraints
 from proto_schema_parser.parser import Parser
 
 from auto_dev.constants import PKG_ROOT, JINJA_TEMPLATE_FOLDER
@@ -19,6 +21,30 @@ from auto_dev.protocols.adapters import FileAdapter
 
 if TYPE_CHECKING:
     from types import ModuleType
+    from collections.abc import Iterable
+
+    from proto_schema_parser import ast
+
+
+_RUNTIME_IMPORT_RE = re.compile(
+    rb"^from\s+google\.protobuf\s+import\s+runtime_version\s+as\s+_runtime_version\s*\n", re.MULTILINE
+)
+_VALIDATE_CALL_RE = re.compile(rb"_runtime_version\.ValidateProtobufRuntimeVersion\s*\(\s*[^)]*\)\s*\n?", re.DOTALL)
+
+
+@cache
+def get_jinja_env() -> Environment:
+    """Shared jinja2.Environment for the protocol templates, with an on-disk bytecode cache.
+
+    Templates are not reloaded once loaded, so renders never stat the template files.
+    """
+    return Environment(
+        loader=FileSystemLoader(JINJA_TEMPLATE_FOLDER),
+        autoescape=False,  # noqa: S701
+        auto_reload=False,
+        cache_size=400,
+        bytecode_cache=FileSystemBytecodeCache(),
+    )
 
 
 class JinjaTemplates(BaseModel, arbitrary_types_allowed=True):
@@ -29,10 +55,10 @@ class JinjaTemplates(BaseModel, arbitrary_types_allowed=True):
     hypothesis: Template
 
     @classmethod
+    @cache
     def load(cls):
         """Load from jinja2.Environment."""
-        env = Environment(loader=FileSystemLoader(JINJA_TEMPLATE_FOLDER), autoescape=False)  # noqa
-        env.globals["formatter"] = formatter
+        env = get_jinja_env()
         return cls(**{field: env.get_template(f"protocols/{field}.jinja") for field in cls.model_fields})
 
 
@@ -73,6 +99,7 @@ class TemplateContext(BaseModel):
     )
 
     file: Any
+    models: Annotated[str, StringConstraints(strip_whitespace=False)]  # pre-rendered, keep blank lines intact
     float_primitives: list[type]
     integer_primitives: list[type]
     import_paths: ImportPaths
@@ -84,14 +111,30 @@ class TemplateContext(BaseModel):
         return {name: getattr(self, name) for name in self.model_fields}
 
 
-def get_repo_root() -> Path:
-    """Get repository root directory path."""
+@cache
+def _find_repo_root(cwd: Path) -> Path:
+    for directory in (cwd, *cwd.parents):
+        if (directory / ".git").exists():
+            return directory
 
+    # not inside a work tree we can see; let git report it (or handle GIT_DIR setups)
     command = ["git", "rev-parse", "--show-toplevel"]
-    repo_root = subprocess.check_output(command, stderr=subprocess.STDOUT).strip()  # nosec: B603
+    repo_root = subprocess.check_output(command, cwd=cwd, stderr=subprocess.STDOUT).strip()  # nosec: B603
     return Path(repo_root.decode("utf-8"))
 
 
+def get_repo_root() -> Path:
+    """Get repository root directory path."""
+
+    return _find_repo_root(Path.cwd().resolve())
+
+
+@lru_cache(maxsize=128)
+def parse_proto(content: str) -> ast.File:
+    """Parse .proto source, memoized on the source text. Callers must not mutate the result."""
+    return Parser().parse(content)
+
+
 def _compute_import_path(file_path: Path, repo_root: Path) -> str:
     if file_path.is_relative_to(repo_root):
         relative_path = file_path.relative_to(repo_root)
@@ -99,84 +142,80 @@ def _compute_import_path(file_path: Path, repo_root: Path) -> str:
     return f".{file_path.stem}"
 
 
-def _remove_runtime_version_code(pb2_content: str) -> str:
-    pb2_content = re.sub(
-        r"^from\s+google\.protobuf\s+import\s+runtime_version\s+as\s+_runtime_version\s*\n",
-        "",
-        pb2_content,
-        flags=re.MULTILINE,
-    )
-    return re.sub(
-        r"_runtime_version\.ValidateProtobufRuntimeVersion\s*\(\s*[^)]*\)\s*\n?", "", pb2_content, flags=re.DOTALL
-    )
-
-
-def _get_locally_defined_classes(module: ModuleType) -> list[type]:
-    def locally_defined(obj):
-        return isinstance(obj, type) and obj.__module__ == module.__name__
-
-    return list(filter(locally_defined, vars(module).values()))
+def _remove_runtime_version_code(pb2_content: bytes) -> bytes:
+    if b"_runtime_version" not in pb2_content:
+        return pb2_content
+    pb2_content = _RUNTIME_IMPORT_RE.sub(b"", pb2_content)
+    return _VALIDATE_CALL_RE.sub(b"", pb2_content)
 
 
 def copy_primitives(pkg_root: Path, code_outpath: Path) -> Path:
     """Copy primitives."""
     primitives_py = pkg_root / "protocols" / "primitives.py"
     primitives_outpath = code_outpath.parent / primitives_py.name
-    primitives_outpath.write_text(primitives_py.read_text())
+    shutil.copyfile(primitives_py, primitives_outpath)
     return primitives_outpath
 
 
-def _run_protoc(proto_inpath: Path, code_outpath: Path) -> Path:
-    subprocess.run(
+def _start_protoc(proto_inpaths: list[Path], out_dir: Path) -> subprocess.Popen:
+    proto_dir = proto_inpaths[0].parent
+    return subprocess.Popen(  # nosec: B603
         [
             "protoc",
-            f"--python_out={code_outpath.parent}",
-            f"--proto_path={proto_inpath.parent}",
-            proto_inpath.name,
+            f"--python_out={out_dir}",
+            f"--proto_path={proto_dir}",
+            *(proto_inpath.name for proto_inpath in proto_inpaths),
         ],
-        cwd=proto_inpath.parent,
-        check=True,
+        cwd=proto_dir,
     )
-    return code_outpath.parent / f"{proto_inpath.stem}_pb2.py"
 
 
-def _extract_primitives(primitives_module) -> tuple[list[type], list[type]]:
-    custom_primitives = _get_locally_defined_classes(primitives_module)
-    primitives = [cls for cls in custom_primitives if not inspect.isabstract(cls)]
-    float_primitives = [p for p in primitives if issubclass(p, float)]
-    integer_primitives = [p for p in primitives if issubclass(p, int)]
+def _extract_primitives(primitives_module: ModuleType) -> tuple[list[type], list[type]]:
+    float_primitives = [getattr(primitives_module, name) for name in primitives_module.FLOAT_PRIMITIVES.values()]
+    integer_primitives = [getattr(primitives_module, name) for name in primitives_module.INTEGER_PRIMITIVES.values()]
     return float_primitives, integer_primitives
 
 
-def _prepare_pb2(proto_inpath: Path, code_outpath: Path) -> Path:
-    pb2_path = _run_protoc(proto_inpath, code_outpath)
-    pb2_content = pb2_path.read_text()
-    pb2_content = _remove_runtime_version_code(pb2_content)
-    pb2_path.write_text(pb2_content)
-    return pb2_path
+def strip_runtime_version_code(pb2_path: Path) -> None:
+    """Remove protobuf runtime version checks from a generated pb2 file in place."""
 
+    with pb2_path.open("r+b") as f:
+        pb2_content = f.read()
+        stripped = _remove_runtime_version_code(pb2_content)
+        if stripped != pb2_content:
+            f.seek(0)
+            f.write(stripped)
+            f.truncate()
 
-def create(
+
+def _pb2_paths(proto_inpaths: list[Path], out_dir: Path) -> list[Path]:
+    return [out_dir / f"{proto_inpath.stem}_pb2.py" for proto_inpath in proto_inpaths]
+
+
+def _prepare_pb2(process: subprocess.Popen, proto_inpaths: list[Path], out_dir: Path) -> list[Path]:
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+    pb2_paths = _pb2_paths(proto_inpaths, out_dir)
+    for pb2_path in pb2_paths:
+        strip_runtime_version_code(pb2_path)
+    return pb2_paths
+
+
+def _render(
     proto_inpath: Path,
     code_outpath: Path,
     test_outpath: Path,
-) -> None:
-    """Main function to create pydantic models from a .proto file."""
-
+    float_primitives: list[type],
+    integer_primitives: list[type],
+) -> dict[Path, str]:
     repo_root = get_repo_root()
     jinja_templates = JinjaTemplates.load()
 
-    # Copy primitives file
-    primitives_outpath = copy_primitives(PKG_ROOT, code_outpath)
-
-    # import the custom primitive types
-    float_primitives, integer_primitives = _extract_primitives(primitives_module)
+    # primitives file is copied next to the models once protoc has succeeded
+    primitives_outpath = code_outpath.parent / "primitives.py"
 
     # load the .proto file AST tree
-    file = FileAdapter.from_file(Parser().parse(proto_inpath.read_text()))
-
-    # Run protoc to generate pb2 file, then remove runtime imports
-    pb2_path = _prepare_pb2(proto_inpath, code_outpath)
+    file = FileAdapter.from_file(parse_proto(proto_inpath.read_text()))
 
     # compute import paths
     strategies_outpath = test_outpath.parent / "primitive_strategies.py"
@@ -190,20 +229,74 @@ def create(
     )
     template_context = TemplateContext(
         file=file,
+        models=formatter.render(file),
         float_primitives=float_primitives,
         integer_primitives=integer_primitives,
         import_paths=import_paths,
-        messages_pb2=pb2_path.with_suffix("").name,
+        messages_pb2=f"{proto_inpath.stem}_pb2",
     )
 
     # render jinja templates
     jinja_kwargs = template_context.shallow_dump()
 
-    generated_code = jinja_templates.protodantic.render(**jinja_kwargs)
-    code_outpath.write_text(generated_code)
+    return {
+        code_outpath: jinja_templates.protodantic.render(**jinja_kwargs),
+        strategies_outpath: jinja_templates.primitive_strategies.render(**jinja_kwargs),
+        test_outpath: jinja_templates.hypothesis.render(**jinja_kwargs),
+    }
+
+
+def create_many(specs: Iterable[tuple[Path, Path, Path]]) -> None:
+    """Create pydantic models for several .proto files.
+
+    Each spec is a `(proto_inpath, code_outpath, test_outpath)` tuple. Files that share a
+    source and output directory are compiled by a single protoc invocation.
+    """
 
-    generated_strategies = jinja_templates.primitive_strategies.render(**jinja_kwargs)
-    strategies_outpath.write_text(generated_strategies)
+    specs = list(specs)
+
+    # import the custom primitive types
+    float_primitives, integer_primitives = _extract_primitives(primitives_module)
+
+    # Start protoc for each batch; it runs while the templates are rendered in memory
+    batches: dict[tuple[Path, Path], dict[Path, None]] = defaultdict(dict)
+    for proto_inpath, code_outpath, _ in specs:
+        batches[proto_inpath.parent, code_outpath.parent][proto_inpath] = None
+    protoc_runs: list[tuple[subprocess.Popen, list[Path], Path]] = []
+    try:
+        for (_, out_dir), proto_inpaths in batches.items():
+            protoc_runs.append((_start_protoc(list(proto_inpaths), out_dir), list(proto_inpaths), out_dir))
+
+        rendered: dict[Path, str] = {}
+        for proto_inpath, code_outpath, test_outpath in specs:
+            rendered.update(_render(proto_inpath, code_outpath, test_outpath, float_primitives, integer_primitives))
+
+        # Wait for protoc to generate the pb2 files, then remove runtime imports
+        for process, proto_inpaths, out_dir in protoc_runs:
+            _prepare_pb2(process, proto_inpaths, out_dir)
+    except BaseException:
+        # Never leave a protoc process behind, nor the pb2 files of batches that did finish
+        for process, proto_inpaths, out_dir in protoc_runs:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            if process.returncode == 0:
+                for pb2_path in _pb2_paths(proto_inpaths, out_dir):
+                    pb2_path.unlink(missing_ok=True)
+        raise
+
+    # Only write the rendered output once every protoc run has succeeded
+    for code_outpath in {code_outpath.parent: code_outpath for _, code_outpath, _ in specs}.values():
+        copy_primitives(PKG_ROOT, code_outpath)
+    for outpath, content in rendered.items():
+        outpath.write_text(content, encoding="utf-8")
+
+
+def create(
+    proto_inpath: Path,
+    code_outpath: Path,
+    test_outpath: Path,
+) -> None:
+    """Main function to create pydantic models from a .proto file."""
 
-    generated_tests = jinja_templates.hypothesis.render(**jinja_kwargs)
-    test_outpath.write_text(generated_tests)
+    create_many([(proto_inpath, code_outpath, test_outpath)])
@@ -2,26 +2,26 @@
 
 import re
 import ast as pyast
-import shutil
-import inspect
 import tempfile
-import importlib
 import subprocess
-from enum import IntEnum
 from pathlib import Path
-from functools import cached_property
+from functools import cache, cached_property
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 
 import yaml
-from jinja2 import Template, Environment, FileSystemLoader
+from jinja2 import Template
 from pydantic import BaseModel, ConfigDict
+from aea.cli.fingerprint import fingerprint_package
 from proto_schema_parser import ast
-from proto_schema_parser.parser import Parser
-from aea.protocols.generator.base import ProtocolGenerator
+from aea.configurations.base import ProtocolSpecificationParseError
+from aea.configurations.loader import load_protocol_specification_from_string
+from aea.configurations.data_types import PackageType
 from proto_schema_parser.generator import Generator
+from aea.protocols.generator.validate import validate as validate_protocol_specification
 
-from auto_dev.utils import file_swapper, remove_prefix, camel_to_snake, snake_to_camel
-from auto_dev.constants import DEFAULT_ENCODING, JINJA_TEMPLATE_FOLDER
+from auto_dev.utils import YamlLoader, remove_prefix, camel_to_snake, snake_to_camel
+from auto_dev.constants import DEFAULT_ENCODING
 from auto_dev.protocols import protodantic, performatives
 
 
@@ -65,9 +65,10 @@ class JinjaTemplates(BaseModel, arbitrary_types_allowed=True):
     test_messages: Template
 
     @classmethod
+    @cache
     def load(cls):
         """Load from jinja2.Environment."""
-        env = Environment(loader=FileSystemLoader(JINJA_TEMPLATE_FOLDER), autoescape=False)  # noqa
+        env = protodantic.get_jinja_env()
         return cls(**{field: env.get_template(f"protocols/{field}.jinja") for field in cls.model_fields})
 
 
@@ -132,6 +133,7 @@ class ProtocolSpecification(BaseModel):
     metadata: Metadata
     custom_definitions: dict[str, str] | None = None
     interaction_model: InteractionModel
+    definition: str | None = None
 
     @property
     def name(self) -> str:
@@ -143,17 +145,22 @@ class ProtocolSpecification(BaseModel):
         """Protocol author."""
         return self.metadata.author
 
-    @property
+    @cached_property
+    def display_name(self) -> str:
+        """Protocol name as capitalized words."""
+        return " ".join(map(str.capitalize, self.name.split("_")))
+
+    @cached_property
     def camel_name(self) -> str:
         """Protocol name in camel case."""
         return snake_to_camel(self.metadata.name)
 
-    @property
+    @cached_property
     def custom_types(self) -> list[str]:
         """Top-level custom type names in protocol specification."""
-        return [custom_type.removeprefix("ct:") for custom_type in self.custom_definitions]
+        return [custom_type.removeprefix("ct:") for custom_type in self.custom_definitions or ()]
 
-    @property
+    @cached_property
     def performative_types(self) -> dict[str, dict[str, str]]:
         """Python type annotation for performatives."""
 
@@ -165,17 +172,17 @@ class ProtocolSpecification(BaseModel):
             performative_types[performative] = field_types
         return performative_types
 
-    @property
+    @cached_property
     def outpath(self) -> Path:
         """Protocol expected outpath after `aea create` and `aea publish --local`."""
         return protodantic.get_repo_root() / "packages" / self.author / "protocols" / self.name
 
-    @property
+    @cached_property
     def code_outpath(self) -> Path:
         """Outpath for custom_types.py."""
         return self.outpath / "custom_types.py"
 
-    @property
+    @cached_property
     def test_outpath(self) -> Path:
         """Outpath for tests/test_custom_types.py."""
         return self.outpath / "tests" / "test_custom_types.py"
@@ -186,16 +193,18 @@ class ProtocolSpecification(BaseModel):
 
         roles = [{"name": r.upper(), "value": r} for r in self.interaction_model.roles]
         end_states = [{"name": s.upper(), "value": idx} for idx, s in enumerate(self.interaction_model.end_states)]
-        protocol_definition = Path(self.path).read_text(encoding="utf-8")
+        protocol_definition = self.definition
+        if protocol_definition is None:
+            protocol_definition = Path(self.path).read_text(encoding="utf-8")
 
         return TemplateContext(
             header="# Auto-generated by tool",
             description=self.metadata.description,
             protocol_definition=protocol_definition,
             author=self.metadata.author,
-            name=" ".join(map(str.capitalize, self.name.split("_"))),
+            name=self.display_name,
             snake_name=self.metadata.name,
-            camel_name=snake_to_camel(self.metadata.name),
+            camel_name=self.camel_name,
             custom_types=self.custom_types,
             initial_performatives=self.interaction_model.initiation,
             terminal_performatives=self.interaction_model.termination,
@@ -212,7 +221,7 @@ class ProtocolSpecification(BaseModel):
 def read_protocol_spec(filepath: str) -> ProtocolSpecification:
     """Read protocol specification."""
 
-    content = Path(filepath).read_text(encoding=DEFAULT_ENCODING)
+    definition = content = Path(filepath).read_text(encoding=DEFAULT_ENCODING)
 
     # parse from README.md, otherwise we assume protocol.yaml
     if "```" in content:
@@ -221,12 +230,12 @@ def read_protocol_spec(filepath: str) -> ProtocolSpecification:
             raise ValueError(msg)
         content = remove_prefix(content.split("```")[1], "yaml")
 
-    # use ProtocolGenerator to validate the specification
-    with tempfile.NamedTemporaryFile(mode="w", encoding=DEFAULT_ENCODING) as temp_file:
-        Path(temp_file.name).write_text(content, encoding=DEFAULT_ENCODING)
-        ProtocolGenerator(temp_file.name)
+    # validate the specification as ProtocolGenerator would, without its tool checks or a temp file
+    is_valid, validation_msg = validate_protocol_specification(load_protocol_specification_from_string(content))
+    if not is_valid:
+        raise ProtocolSpecificationParseError(validation_msg)
 
-    content = list(yaml.safe_load_all(content))
+    content = list(yaml.load_all(content, Loader=YamlLoader))
     if len(content) == 3:
         metadata, custom_definitions, interaction_model = content
     elif len(content) == 2:
@@ -241,6 +250,7 @@ def read_protocol_spec(filepath: str) -> ProtocolSpecification:
         metadata=metadata,
         custom_definitions=custom_definitions,
         interaction_model=interaction_model,
+        definition=definition,
     )
 
 
@@ -250,7 +260,8 @@ def run_cli_cmd(command: list[str], cwd: Path | None = None):
     result = subprocess.run(
         command,
         shell=False,
-        capture_output=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
         text=True,
         check=False,
         cwd=cwd or Path.cwd(),
@@ -275,7 +286,6 @@ def run_push_local_protocol(protocol: ProtocolSpecification, agent_dir: Path) ->
 def generate_readme(protocol, template):
     """Generate protocol README.md file."""
     readme = protocol.outpath / "README.md"
-    Path(protocol.path).read_text(encoding="utf-8")
     content = template.render(**protocol.template_context.model_dump())
     readme.write_text(content.strip())
 
@@ -284,47 +294,51 @@ def generate_custom_types(protocol: ProtocolSpecification):
     """Generate custom_types.py and tests/test_custom_types.py."""
 
     proto_inpath = protocol.outpath / f"{protocol.name}.proto"
-    file = Parser().parse(proto_inpath.read_text())
+    parsed = protodantic.parse_proto(proto_inpath.read_text())
 
     # extract custom type messages from AEA framework "wrapper" message
-    main_message = file.file_elements.pop(1)
-    custom_type_names = {name.removeprefix("ct:") for name in protocol.custom_definitions}
+    # (build a new ast.File, the parsed tree is shared through the parse cache)
+    file_elements = list(parsed.file_elements)
+    main_message = file_elements.pop(1)
+    custom_type_names = set(protocol.custom_types)
     for element in main_message.elements:
         if isinstance(element, ast.Message) and element.name in custom_type_names:
-            file.file_elements.append(element)
+            file_elements.append(element)
+    file = ast.File(syntax=parsed.syntax, file_elements=file_elements)
 
     proto = Generator().generate(file)
-    tmp_proto_path = protocol.outpath / f"tmp_{proto_inpath.name}"
-    tmp_proto_path.write_text(proto)
 
+    # protoc reads the custom types .proto from a temporary --proto_path under the original
+    # file name, so the module it writes into the protocol folder keeps the same name.
     proto_pb2 = protocol.outpath / f"{protocol.name}_pb2.py"
-    backup_pb2 = proto_pb2.with_suffix(".bak")
-    shutil.move(str(proto_pb2), str(backup_pb2))
-    with file_swapper(proto_inpath, tmp_proto_path):
-        protodantic.create(
-            proto_inpath=proto_inpath,
-            code_outpath=protocol.code_outpath,
-            test_outpath=protocol.test_outpath,
-        )
-    shutil.move(str(backup_pb2), str(proto_pb2))
-    pb2_content = proto_pb2.read_text()
-    pb2_content = protodantic._remove_runtime_version_code(pb2_content)  # noqa: SLF001
-    proto_pb2.write_text(pb2_content)
-    tmp_proto_path.unlink()
+    original_pb2 = proto_pb2.read_bytes()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_proto_path = Path(tmp_dir) / proto_inpath.name
+            tmp_proto_path.write_text(proto)
+            protodantic.create(
+                proto_inpath=tmp_proto_path,
+                code_outpath=protocol.code_outpath,
+                test_outpath=protocol.test_outpath,
+            )
+    finally:
+        proto_pb2.write_bytes(original_pb2)
+    protodantic.strip_runtime_version_code(proto_pb2)
 
 
 def post_enum_processing(protocol: ProtocolSpecification):
     """AST-based in-place flattening of enum-only message classes."""
 
-    # Dynamically import the generated models to detect enum-only message classes
-    spec = importlib.util.spec_from_file_location("generated_models", protocol.code_outpath)
-    models_mod = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(models_mod)
+    # Detect enum-only message classes from the generated source, without importing it
+    tree = pyast.parse(protocol.code_outpath.read_text())
+
+    def base_names(node: pyast.ClassDef) -> set[str]:
+        return {base.id for base in node.bases if isinstance(base, pyast.Name)}
 
-    def is_enum_only_model(cls: type[BaseModel]) -> bool:
-        nested = [member for _, member in inspect.getmembers(cls, inspect.isclass) if issubclass(member, IntEnum)]
-        fields = list(cls.model_fields)
-        return len(nested) == 1 and len(fields) == 1
+    def enum_only_member(node: pyast.ClassDef) -> pyast.ClassDef | None:
+        nested = [n for n in node.body if isinstance(n, pyast.ClassDef) and "IntEnum" in base_names(n)]
+        fields = [n for n in node.body if isinstance(n, pyast.AnnAssign) and isinstance(n.target, pyast.Name)]
+        return nested[0] if len(nested) == 1 and len(fields) == 1 else None
 
     def inject_comment(src: str, comment: str) -> str:
         # Matches the whole leading import block (one or more import lines + trailing blank lines)
@@ -332,30 +346,29 @@ def post_enum_processing(protocol: ProtocolSpecification):
         replacement = r"\1" + comment.rstrip() + "\n\n"
         return pattern.sub(replacement, src, count=1)
 
-    enum_only_names = {
-        name
-        for name, cls in inspect.getmembers(models_mod, inspect.isclass)
-        if cls.__module__ == models_mod.__name__ and issubclass(cls, BaseModel) and is_enum_only_model(cls)
-    }
-
     # Pre-generate flat enum class source snippets
     flat_src_map: dict[str, str] = {}
-    for name in enum_only_names:
-        snake_name = camel_to_snake(name)
-        cls = getattr(models_mod, name)
-        enum = next(member for _, member in inspect.getmembers(cls, inspect.isclass) if issubclass(member, IntEnum))
+    for node in tree.body:
+        if not isinstance(node, pyast.ClassDef) or "BaseModel" not in base_names(node):
+            continue
+        if (enum := enum_only_member(node)) is None:
+            continue
         clean_members = []
-        prefix = camel_to_snake(enum.__name__).upper()
-        for member_name, member in enum.__members__.items():
-            clean = member_name.removeprefix(f"{prefix}_")
-            clean_members.append(f"{clean} = {member.value}")
+        prefix = camel_to_snake(enum.name).upper()
+        for stmt in enum.body:
+            if not isinstance(stmt, pyast.Assign):
+                continue
+            value = pyast.literal_eval(stmt.value)
+            for target in stmt.targets:
+                clean = target.id.removeprefix(f"{prefix}_")
+                clean_members.append(f"{clean} = {value}")
 
         snippet = FLAT_ENUM_TEMPLATE.format(
-            name=name,
+            name=node.name,
             clean_members="\n    ".join(clean_members),
-            snake_name=snake_name,
+            snake_name=camel_to_snake(node.name),
         )
-        flat_src_map[name] = snippet.strip()
+        flat_src_map[node.name] = snippet.strip()
 
     # AST-transformer that replaces those ClassDefs
     class EnumFlattener(pyast.NodeTransformer):
@@ -366,7 +379,6 @@ def post_enum_processing(protocol: ProtocolSpecification):
             return node
 
     # Apply transformation
-    tree = pyast.parse(protocol.code_outpath.read_text())
     new_tree = EnumFlattener().visit(tree)
     pyast.fix_missing_locations(new_tree)
 
@@ -384,11 +396,14 @@ def rewrite_test_custom_types(protocol: ProtocolSpecification) -> None:
     protocol.test_outpath.write_text(content.replace(a, b))
 
 
+def dump_template(template: Template, protocol: ProtocolSpecification, outpath: Path) -> None:
+    """Stream a rendered template straight into `outpath`, without building the output string."""
+    template.stream(**protocol.template_context.model_dump()).dump(str(outpath), encoding=DEFAULT_ENCODING)
+
+
 def generate_dialogues(protocol: ProtocolSpecification, template):
     """Generate dialogues.py."""
-    output = template.render(**protocol.template_context.model_dump())
-    dialogues = protocol.outpath / "dialogues.py"
-    dialogues.write_text(output)
+    dump_template(template, protocol, protocol.outpath / "dialogues.py")
 
 
 def generate_tests_init(protocol: ProtocolSpecification) -> None:
@@ -399,29 +414,23 @@ def generate_tests_init(protocol: ProtocolSpecification) -> None:
 
 def generate_performative_messages(protocol: ProtocolSpecification, template) -> None:
     """Generate performatives for hypothesis strategy generation."""
-    output = template.render(**protocol.template_context.model_dump())
-    test_dialogues = protocol.outpath / "tests" / "performatives.py"
-    test_dialogues.write_text(output)
+    dump_template(template, protocol, protocol.outpath / "tests" / "performatives.py")
 
 
 def generate_test_dialogues(protocol: ProtocolSpecification, template) -> None:
     """Generate tests/test_dialogue.py."""
-    output = template.render(**protocol.template_context.model_dump())
-    test_dialogues = protocol.outpath / "tests" / f"test_{protocol.name}_dialogues.py"
-    test_dialogues.write_text(output)
+    dump_template(template, protocol, protocol.outpath / "tests" / f"test_{protocol.name}_dialogues.py")
 
 
 def generate_test_messages(protocol: ProtocolSpecification, template) -> None:
     """Generate tests/test_messages.py."""
-    output = template.render(**protocol.template_context.model_dump())
-    test_messages = protocol.outpath / "tests" / f"test_{protocol.name}_messages.py"
-    test_messages.write_text(output)
+    dump_template(template, protocol, protocol.outpath / "tests" / f"test_{protocol.name}_messages.py")
 
 
 def update_yaml(protocol, dependencies: dict[str, dict[str, str]]) -> None:
     """Update protocol.yaml dependencies."""
     protocol_yaml = protocol.outpath / "protocol.yaml"
-    content = yaml.safe_load(protocol_yaml.read_text())
+    content = yaml.load(protocol_yaml.read_text(), Loader=YamlLoader)  # noqa: S506
     for package_name, package_info in dependencies.items():
         content["dependencies"][package_name] = package_info
         content["dependencies"][package_name] = package_info
@@ -441,9 +450,8 @@ def run_adev_lint(protocol) -> None:
 
 
 def run_aea_fingerprint(protocol) -> None:
-    """Run `aea fingerprint protocol`."""
-    command = ["aea", "fingerprint", "protocol", protocol.metadata.protocol_specification_id]
-    run_cli_cmd(command)
+    """Fingerprint the protocol in-process, as `aea fingerprint protocol` would."""
+    fingerprint_package(Path.cwd() / "protocols" / protocol.name, PackageType.PROTOCOL)
 
 
 def protocol_scaffolder(protocol_specification_path: str, language, logger, verbose: bool = True):  # noqa: ARG001
@@ -482,20 +490,19 @@ def protocol_scaffolder(protocol_specification_path: str, language, logger, verb
     # 5. rewrite test_custom_types to patch the import
     rewrite_test_custom_types(protocol)
 
-    # 6. Dialogues
-    generate_dialogues(protocol, jinja_templates.dialogues)
-
-    # 7. generate __init__.py in tests folder
-    generate_tests_init(protocol)
-
-    # 8. generate performatives
-    generate_performative_messages(protocol, jinja_templates.performatives)
-
-    # 9. Test dialogues
-    generate_test_dialogues(protocol, jinja_templates.test_dialogues)
-
-    # 10. Test messages
-    generate_test_messages(protocol, jinja_templates.test_messages)
+    # 6 - 10. Dialogues, tests/__init__.py, performatives, test dialogues and test messages.
+    # These write independent files, so render them concurrently; build the shared context first.
+    _ = protocol.template_context
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [
+            executor.submit(generate_dialogues, protocol, jinja_templates.dialogues),
+            executor.submit(generate_tests_init, protocol),
+            executor.submit(generate_performative_messages, protocol, jinja_templates.performatives),
+            executor.submit(generate_test_dialogues, protocol, jinja_templates.test_dialogues),
+            executor.submit(generate_test_messages, protocol, jinja_templates.test_messages),
+        ]
+        for future in futures:
+            future.result()
 
     # 11. Update YAML
     dependencies = {"pydantic": {}, "hypothesis": {}}
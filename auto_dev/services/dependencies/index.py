@@ -1,6 +1,7 @@
 """Service for handling component dependencies."""
 
 from pathlib import Path
+from collections import defaultdict
 
 from auto_dev.utils import load_autonolas_yaml
 
@@ -19,7 +20,7 @@ class DependencyBuilder:
         """
         self.component_path = Path(component_path)
         self.component_type = component_type
-        self.dependencies: dict[str, set[str]] = {}
+        self.dependencies: defaultdict[str, set[str]] = defaultdict(set)
 
     def process_dependencies_field(self, config_deps: dict) -> None:
         """Process the dependencies field of a component config.
@@ -29,10 +30,9 @@ class DependencyBuilder:
             config_deps: Dependencies configuration from component config
 
         """
+        dependencies = self.dependencies
         for dep_type, deps in config_deps.items():
-            if dep_type not in self.dependencies:
-                self.dependencies[dep_type] = set()
-            self.dependencies[dep_type].update(deps)
+            dependencies[dep_type].update(deps)
 
     def process_component_field(self, field_type: str, field_deps: list) -> None:
         """Process a component field (protocols, contracts, etc) from config.
@@ -43,8 +43,6 @@ class DependencyBuilder:
             field_deps: List of dependencies for this field
 
         """
-        if field_type not in self.dependencies:
-            self.dependencies[field_type] = set()
         self.dependencies[field_type].update(field_deps)
 
     @classmethod
@@ -69,16 +67,16 @@ class DependencyBuilder:
             dependency_fields = ["dependencies", "protocols", "contracts", "connections", "skills"]
 
             for field in dependency_fields:
-                if field not in config:
+                if (field_config := config.get(field)) is None:
                     continue
 
                 if field == "dependencies":
-                    builder.process_dependencies_field(config[field])
+                    builder.process_dependencies_field(field_config)
                 else:
                     field_type = field[:-1]  # Remove 's' from end
-                    builder.process_component_field(field_type, config[field])
+                    builder.process_component_field(field_type, field_config)
 
-            return builder.dependencies
+            return dict(builder.dependencies)
         except (FileNotFoundError, ValueError) as e:
             msg = f"Failed to build dependency tree for component {component_path}"
             raise ValueError(msg) from e
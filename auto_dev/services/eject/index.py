@@ -1,11 +1,15 @@
 # ruff: noqa: PLR1702
 """Service functions for the eject command."""
 
+import os
+import re
 import shutil
 from copy import deepcopy
 from typing import cast
 from pathlib import Path
+from functools import lru_cache
 from dataclasses import field, dataclass
+from concurrent.futures import ThreadPoolExecutor
 
 from rich.table import Table
 from rich.console import Console
@@ -18,7 +22,6 @@ from aea.cli.eject import (
     get_package_path,
     update_references,
     update_item_config,
-    copy_package_directory,
     find_topological_order,
     replace_all_import_statements,
     update_item_public_id_in_init,
@@ -42,6 +45,12 @@ from auto_dev.services.runner import DevAgentRunner
 from auto_dev.services.package_manager.index import PackageManager
 
 
+@lru_cache(maxsize=4096)
+def _parse_public_id(public_id: str) -> PublicId:
+    """Parse a public id string, reusing the result for strings seen before."""
+    return PublicId.from_str(public_id)
+
+
 @dataclass
 class EjectConfig:
     """Configuration for ejection."""
@@ -63,6 +72,8 @@ class ComponentEjector:
         self.logger = get_logger(__name__)
         self.package_manager = PackageManager(verbose=True)
         self._ejected_components: dict[PackageId, PackageId] = {}
+        # the agent directory, resolved once so every step of the ejection works against the same tree
+        self._cwd = Path.cwd()
 
     def eject(self, display=False) -> list[PublicId]:
         """Eject a component and all its dependencies recursively.
@@ -109,39 +120,71 @@ class ComponentEjector:
     def update_all_references(self, ejected_components: dict[PackageId, PackageId]) -> None:
         """We need to update all references in the agent to the new components."""
         # We use a find and replace to update all references in the agent to the new name.
+        # Component configs are loaded once, updated in memory for every ejected package and written once.
+        package_dirs = {
+            new_package_id: self._package_dir(new_package_id) for new_package_id in ejected_components.values()
+        }
+        loaded_configs = {
+            new_package_id: load_autonolas_yaml(new_package_id.package_type.value, package_dir)[0]
+            for new_package_id, package_dir in package_dirs.items()
+        }
+        # the loaded configs are kept as they are on disk, so unchanged files can be skipped when writing
+        component_configs = deepcopy(loaded_configs)
+        self.update_python_files(ejected_components)
         for package_id, new_package_id in ejected_components.items():
-            self.update_python_files(package_id, new_package_id, ejected_components)
-
-            self.update_yaml_files(package_id, new_package_id, ejected_components)
+            self.update_yaml_files(package_id, new_package_id, component_configs)
 
-        agent_config, *overrides = load_autonolas_yaml(PackageType.AGENT)
+        loaded_agent_documents = load_autonolas_yaml(PackageType.AGENT, self._cwd)
+        agent_config, *overrides = deepcopy(loaded_agent_documents)
         agent_config["author"] = self.config.fork_id.author
 
         for package_id, new_package_id in ejected_components.items():
-            agent_config = self.update_agent_config(agent_config, package_id, new_package_id)
+            self.update_agent_config(agent_config, package_id, new_package_id)
+
+        new_overrides = self.update_overrides(overrides, ejected_components)
+
+        # only configs that differ from what is on disk are serialised again
+        yaml_files = {
+            package_dirs[new_package_id] / f"{new_package_id.package_type.value}.yaml": component_config
+            for new_package_id, component_config in component_configs.items()
+            if component_config != loaded_configs[new_package_id]
+        }
+        agent_documents = [agent_config, *new_overrides]
+        if agent_documents != loaded_agent_documents:
+            yaml_files[self._cwd / DEFAULT_AEA_CONFIG_FILE] = agent_documents
+        self._write_yaml_files(yaml_files)
+
+    def update_overrides(self, overrides: list[dict], ejected_components: dict[PackageId, PackageId]) -> list[dict]:
+        """Point the agent's overrides of ejected packages at the new package ids."""
+        # an agent holds a single version of each package, so overrides are matched on type, author and name;
+        # the version and hash of the override may differ from the ejected package id
+        override_index: dict[tuple[PackageType, str, str], str] = {}
+        for package_id, new_package_id in ejected_components.items():
+            override_index.setdefault(
+                (package_id.package_type, package_id.public_id.author, package_id.public_id.name),
+                str(new_package_id.public_id),
+            )
+        filtered_ejected_components = {
+            k.public_id: v for k, v in ejected_components.items() if k.package_type == PackageType.SKILL
+        }
 
         new_overrides = []
         for override in overrides:
-            override_package_id = PackageId(
-                public_id=PublicId.from_str(override.get("public_id")), package_type=PackageType(override.get("type"))
+            override_package_type = PackageType(override.get("type"))
+            override_public_id = _parse_public_id(override.get("public_id"))
+            new_str_public_id = override_index.get(
+                (override_package_type, override_public_id.author, override_public_id.name)
             )
-            for package_id, new_package_id in ejected_components.items():
-                if all(
-                    [
-                        override_package_id.package_type == package_id.package_type,
-                        override.get("public_id").startswith(str(package_id.public_id)),
-                    ]
-                ):
-                    override["public_id"] = str(new_package_id.public_id)
-                    break
+            if new_str_public_id is not None:
+                override["public_id"] = new_str_public_id
 
             # connection specific logic
             if (
-                override_package_id.package_type == PackageType.CONNECTION
+                override_package_type == PackageType.CONNECTION
                 and override.get("config")
                 and override.get("config").get("target_skill_id")
             ):
-                target_skill_id = PublicId.from_str(
+                target_skill_id = _parse_public_id(
                     override.get("config").get("target_skill_id"),
                 )
                 target_skill_id = PublicId(
@@ -149,110 +192,180 @@ class ComponentEjector:
                     name=target_skill_id.name,
                     version="latest",
                 )
-                filtered_ejected_components = {
-                    k.public_id: v for k, v in ejected_components.items() if k.package_type == PackageType.SKILL
-                }
 
                 if target_skill_id in filtered_ejected_components:
                     package_id = filtered_ejected_components[target_skill_id]
                     override["config"]["target_skill_id"] = str(package_id.public_id)
 
             new_overrides.append(override)
+        return new_overrides
 
-        write_to_file(Path.cwd() / DEFAULT_AEA_CONFIG_FILE, [agent_config, *new_overrides], file_type=FileType.YAML)
-
-    def update_agent_config(self, agent_config: dict, package_id: PackageId, new_package_id: PackageId) -> dict:
-        """Update the agent config with the new package id."""
-        new_agent_config = deepcopy(agent_config)
+    def update_agent_config(self, agent_config: dict, package_id: PackageId, new_package_id: PackageId) -> None:
+        """Update the agent config in place with the new package id."""
         plural_package_type = ITEM_TYPE_TO_PLURAL[package_id.package_type.value]
-        current_packages = new_agent_config.get(plural_package_type, [])
-        for package in deepcopy(current_packages):
-            existing_public_id = PublicId.from_str(package)
-            if all(
-                [
-                    existing_public_id.author == package_id.public_id.author,
-                    existing_public_id.name == package_id.public_id.name,
-                ]
-            ):
-                new_public_id = PublicId(
-                    author=new_package_id.public_id.author,
-                    name=new_package_id.public_id.name,
-                    version=existing_public_id.version,
-                )
-                current_packages.remove(package)
-                current_packages.append(str(new_public_id))
-
-        return new_agent_config
+        if plural_package_type not in agent_config:
+            return
+
+        # single pass; renamed packages are moved to the end of the list
+        ejected_author_name = (package_id.public_id.author, package_id.public_id.name)
+        current_packages = agent_config[plural_package_type]
+        kept_packages, renamed_packages = [], []
+        for package in current_packages:
+            existing_public_id = _parse_public_id(package)
+            if (existing_public_id.author, existing_public_id.name) != ejected_author_name:
+                kept_packages.append(package)
+                continue
+            new_public_id = PublicId(
+                author=new_package_id.public_id.author,
+                name=new_package_id.public_id.name,
+                version=existing_public_id.version,
+            )
+            renamed_packages.append(str(new_public_id))
+        current_packages[:] = kept_packages + renamed_packages
 
-    def update_python_files(
-        self, package_id: PackageId, new_package_id: PublicId, ejected_components: dict[PackageId, PackageId]
-    ) -> None:
-        """We search for all python files in the agent and update the references to the new package id."""
-        replacements = []
+    def update_python_files(self, ejected_components: dict[PackageId, PackageId]) -> None:
+        """We search for all python files in the agent and update the references to the new package ids."""
+        replacements = {}
+        for package_id, new_package_id in ejected_components.items():
+            for old, new in self.get_python_replacements(package_id, new_package_id).items():
+                # the first ejected package claims an ambiguous string, as when replacing one package at a time
+                if old != new:
+                    replacements.setdefault(old.encode(DEFAULT_ENCODING), new.encode(DEFAULT_ENCODING))
+        if not replacements:
+            return
+
+        # a single pass per file for every ejected package, preferring the longest match where names overlap;
+        # sources are rewritten as raw bytes so files are never decoded and re-encoded
+        pattern = re.compile(b"|".join(map(re.escape, sorted(replacements, key=len, reverse=True))))
+
+        # each package type directory only needs to be scanned once, however many components were ejected into it
+        directories = {
+            self._cwd / ITEM_TYPE_TO_PLURAL[dependent_package_id.package_type.value]
+            for dependent_package_id in ejected_components.values()
+        }
+        # os.walk lists each directory once, using the entry types returned by scandir rather than a stat per entry
+        python_files = [
+            Path(root, name)
+            for directory in directories
+            for root, _, file_names in os.walk(directory)
+            for name in file_names
+            if name.endswith(".py")
+        ]
+
+        def rewrite(python_file: Path) -> None:
+            file_data, count = pattern.subn(lambda match: replacements[match.group(0)], python_file.read_bytes())
+            if count:
+                python_file.write_bytes(file_data)
+
+        # every file is rewritten independently, so overlap the reads and writes across threads
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(rewrite, python_files))
+
+    @staticmethod
+    def get_python_replacements(package_id: PackageId, new_package_id: PackageId) -> dict[str, str]:
+        """Strings referring to the old package in python code, mapped to their new value."""
         old_dotted_path = (
             f"packages.{package_id.public_id.author}.{package_id.package_type.value}s.{package_id.public_id.name}"
         )
         new_dotted_path = f"packages.{new_package_id.public_id.author}.{new_package_id.package_type.value}s.{new_package_id.public_id.name}"  # noqa: E501
-        replacements.append((old_dotted_path, new_dotted_path))
+        replacements = {old_dotted_path: new_dotted_path}
 
         old_str_public_id = str(package_id.public_id).replace("latest", DEFAULT_VERSION)
         new_str_public_id = str(new_package_id.public_id).replace("latest", DEFAULT_VERSION)
-        replacements.append((old_str_public_id, new_str_public_id))
+        replacements[old_str_public_id] = new_str_public_id
 
         if package_id.package_type is PackageType.PROTOCOL:
             # mecessary due to the way the protocol is imported in the generated code
             old_name_camel = "".join(word.capitalize() for word in package_id.public_id.name.split("_")) + "Message"
             new_name_camel = "".join(word.capitalize() for word in new_package_id.public_id.name.split("_")) + "Message"
-            replacements.append((old_name_camel, new_name_camel))
-
-        for dependent_package_id in ejected_components.values():
-            directory = Path.cwd() / ITEM_TYPE_TO_PLURAL[dependent_package_id.package_type.value]
-            for python_file in directory.rglob("*.py"):
-                file_data = python_file.read_text()
-                for old, new in replacements:
-                    file_data = file_data.replace(old, new)
-                python_file.write_text(file_data, encoding=DEFAULT_ENCODING)
+            replacements[old_name_camel] = new_name_camel
+        return replacements
 
-    def update_yaml_files(self, package_id: PackageId, new_package_id: PackageId, ejected_components) -> None:
-        """We search for all yaml files in the agent and update the references to the new package id."""
+    def update_yaml_files(
+        self, package_id: PackageId, new_package_id: PackageId, component_configs: dict[PackageId, dict]
+    ) -> None:
+        """Update the loaded component configs in place with the new package id."""
 
         old_str_public_id = str(package_id.public_id)
         new_str_public_id = str(new_package_id.public_id)
         plural_package_type = ITEM_TYPE_TO_PLURAL[package_id.package_type.value]
 
-        directory = Path.cwd() / ITEM_TYPE_TO_PLURAL[package_id.package_type.value] / new_package_id.public_id.name
-        for yaml_file in directory.glob("*.yaml"):
-            component_config = load_autonolas_yaml(package_id.package_type.value, yaml_file.parent)[0]
-            component_config["author"] = new_package_id.public_id.author
-            component_config["name"] = new_package_id.public_id.name
+        component_config = component_configs[new_package_id]
+        component_config["author"] = new_package_id.public_id.author
+        component_config["name"] = new_package_id.public_id.name
 
-            if package_id.package_type is PackageType.PROTOCOL:
-                component_config["protocol_specification_id"] = new_str_public_id
-
-            write_to_file(yaml_file, component_config, file_type=FileType.YAML)
+        if package_id.package_type is PackageType.PROTOCOL:
+            component_config["protocol_specification_id"] = new_str_public_id
 
-        for dependent_package_id in ejected_components.values():
-            dependent_package_type_plural = ITEM_TYPE_TO_PLURAL[dependent_package_id.package_type.value]
-            dependent_config = load_autonolas_yaml(
-                dependent_package_id.package_type.value,
-                Path.cwd() / dependent_package_type_plural / dependent_package_id.public_id.name,
-            )[0]
+        for dependent_config in component_configs.values():
             current_packages_of_type = dependent_config.get(plural_package_type, [])
             if not current_packages_of_type:
                 continue
-            for package in deepcopy(current_packages_of_type):
+            # single pass; renamed packages are moved to the end of the list
+            kept_packages, renamed_packages = [], []
+            for package in current_packages_of_type:
                 if package.startswith(old_str_public_id):
-                    current_packages_of_type.remove(package)
-                    current_packages_of_type.append(package.replace(old_str_public_id, new_str_public_id))
-            dependent_config[plural_package_type] = current_packages_of_type
-            write_to_file(
-                Path.cwd()
-                / dependent_package_type_plural
-                / dependent_package_id.public_id.name
-                / f"{dependent_package_id.package_type.value}.yaml",
-                dependent_config,
-                file_type=FileType.YAML,
-            )
+                    renamed_packages.append(package.replace(old_str_public_id, new_str_public_id))
+                else:
+                    kept_packages.append(package)
+            if renamed_packages:
+                dependent_config[plural_package_type] = kept_packages + renamed_packages
+
+    @staticmethod
+    def _write_yaml_files(yaml_files: dict[Path, dict | list]) -> None:
+        """Write yaml files, staging every file before any target is replaced.
+
+        Symlinks are followed and each target keeps its permissions. A failure while staging leaves every
+        target untouched; the final renames happen one by one, so a failure there can leave a partial update.
+        """
+        targets = {path: path.resolve() for path in yaml_files}
+        staged_paths = {path: target.with_name(f"{target.name}.tmp") for path, target in targets.items()}
+        try:
+            for path, content in yaml_files.items():
+                write_to_file(staged_paths[path], content, file_type=FileType.YAML)
+                if targets[path].exists():
+                    shutil.copymode(targets[path], staged_paths[path])
+            for path, staged_path in staged_paths.items():
+                staged_path.replace(targets[path])
+        finally:
+            for staged_path in staged_paths.values():
+                staged_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _move_package_directory(src: Path, dst: Path) -> None:
+        """Move a vendor package into the agent's own packages.
+
+        The vendor copy is removed once ejected, so it is moved into place; this is a rename on the same
+        filesystem and falls back to copy and delete across filesystems.
+        """
+        if dst.exists():
+            msg = f"Cannot move {src} to {dst}: destination already exists"
+            raise FileExistsError(msg)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(src, dst)
+        (dst.parent / "__init__.py").touch()
+
+    @staticmethod
+    def _update_moved_package(item_type: str, src: Path, dst: Path, new_public_id: PublicId) -> None:
+        """Set the new public id in a moved package, moving it back to the vendor unchanged on failure."""
+        updated_paths = [dst / f"{item_type}.yaml", dst / "__init__.py"]
+        originals = {path: path.read_bytes() for path in updated_paths if path.exists()}
+        item_config_update = {
+            "author": new_public_id.author,
+            "version": new_public_id.version,
+        }
+        try:
+            update_item_config(item_type, dst, None, **item_config_update)
+            update_item_public_id_in_init(item_type, dst, new_public_id)
+        except BaseException:
+            for path, content in originals.items():
+                path.write_bytes(content)
+            shutil.move(dst, src)
+            raise
+
+    def _package_dir(self, package_id: PackageId) -> Path:
+        """Directory of a non-vendor package in the agent."""
+        return self._cwd / ITEM_TYPE_TO_PLURAL[package_id.package_type.value] / package_id.public_id.name
 
     def show_display(self, ejected_components: dict[PackageId, PackageId]) -> None:
         """Display the ejected components in a table."""
@@ -273,12 +386,12 @@ class ComponentEjector:
     def _run_eject_command(self, component_id: PublicId, component_type: str) -> bool:  # noqa: PLR0914
         """Run the aea eject command."""
         ctx = Context(
-            cwd=Path.cwd(),
+            cwd=self._cwd,
             verbosity="info",
-            registry_path=Path.cwd() / "vendor",
+            registry_path=self._cwd / "vendor",
         )
         agent_loader = ctx.agent_loader
-        with open(DEFAULT_AEA_CONFIG_FILE, encoding="utf-8") as f:
+        with open(self._cwd / DEFAULT_AEA_CONFIG_FILE, encoding="utf-8") as f:
             config = agent_loader.load(f)
         ctx.agent_config = config
 
@@ -286,7 +399,7 @@ class ComponentEjector:
         public_id = component_id
         item_type_plural = item_type + "s"
 
-        cwd = Path.cwd()
+        cwd = self._cwd
         if not is_item_present(
             cwd,
             config,
@@ -344,17 +457,8 @@ class ComponentEjector:
                 dependency_package_id.package_type.value,
             )
 
-        ctx.clean_paths.append(dst)
-        copy_package_directory(Path(src), dst)
-
-        item_config_update = {
-            "author": new_public_id.author,
-            "version": new_public_id.version,
-        }
-
-        update_item_config(item_type, Path(dst), None, **item_config_update)
-        update_item_public_id_in_init(item_type, Path(dst), new_public_id)
-        shutil.rmtree(src)
+        self._move_package_directory(Path(src), Path(dst))
+        self._update_moved_package(item_type, Path(src), Path(dst), new_public_id)
 
         replace_all_import_statements(Path(ctx.cwd), ComponentType(item_type), public_id, new_public_id)
         fingerprint_item(ctx, item_type, new_public_id)
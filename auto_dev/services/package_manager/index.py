@@ -1,5 +1,6 @@
 """This module contains the service logic for publishing agents."""
 
+import os
 import json
 import shutil
 from pathlib import Path
@@ -25,6 +26,15 @@ PACKAGES_NOT_FOUND = (
 logger = get_logger()
 
 
+def _list_directory(path: Path) -> set[str]:
+    """Names of the entries in a directory, empty if it does not exist."""
+    try:
+        with os.scandir(path) as entries:
+            return {entry.name for entry in entries}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+
+
 class PackageManager:
     """Service for managing packages.
 
@@ -300,6 +310,13 @@ class PackageManager:
 
         """
         dev, third_party = {}, {}
+        listings: dict[Path, set[str]] = {}
+
+        def is_present(package_path: Path) -> bool:
+            # one scandir per parent directory, rather than a stat per package
+            if package_path.parent not in listings:
+                listings[package_path.parent] = _list_directory(package_path.parent)
+            return package_path.name in listings[package_path.parent]
 
         config, *_ = load_autonolas_yaml(PackageType.AGENT)
         for package_type in PackageType:
@@ -311,9 +328,9 @@ class PackageManager:
                 package_id = PackageId(public_id=public_id, package_type=package_type)
                 third_party_path = get_package_path(Path.cwd(), package_type.value, public_id, is_vendor=True)
                 dev_path = get_package_path(Path.cwd(), package_type.value, public_id, is_vendor=False)
-                if Path(third_party_path).exists():
+                if is_present(Path(third_party_path)):
                     third_party[package_id] = third_party_path
-                elif Path(dev_path).exists():
+                elif is_present(Path(dev_path)):
                     dev[package_id] = dev_path
         return dev, third_party
 
@@ -336,8 +353,12 @@ class PackageManager:
                 package_path = Path(
                     self.packages_path, package_id.public_id.author, item_type_plural, package_id.public_id.name
                 )
-                if package_path.exists():
+                # rmtree reports a missing package itself, saving an extra stat per package
+                try:
                     shutil.rmtree(package_path)
+                except FileNotFoundError:
+                    logger.debug(f"No package to remove at {package_path}")
+                else:
                     logger.warning(f"Removed package at {package_path}")
 
     def publish_agent(
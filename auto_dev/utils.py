@@ -38,6 +38,10 @@ from auto_dev.constants import OS_ENV_MAP, DEFAULT_ENCODING, AUTONOMY_PACKAGES_F
 from auto_dev.exceptions import NotFound, OperationError
 
 
+# libyaml's C implementation of yaml.SafeLoader, when PyYAML was built against it
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
 def reset_logging():
     """Forcefully remove any existing logging configuration."""
     # Clear all handlers from the root logger
@@ -333,7 +337,7 @@ def load_autonolas_yaml(package_type: PackageType, directory: str | Path | None
         msg = f"Could not find {config_path}, are you in the correct directory?"
         raise FileNotFoundError(msg)
 
-    return list(yaml.safe_load_all(config_path.read_text(encoding=DEFAULT_ENCODING)))
+    return list(yaml.load_all(config_path.read_text(encoding=DEFAULT_ENCODING), Loader=YamlLoader))
 
 
 def load_aea_ctx(func: Callable[[click.Context, Any, Any], Any]) -> Callable[[click.Context, Any, Any], Any]:
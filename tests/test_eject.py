@@ -1,9 +1,39 @@
 """Tests for the eject command."""
 
+import os
 from pathlib import Path
 
+import pytest
+from aea.configurations.base import PublicId, PackageId, PackageType
+
+from auto_dev.utils import FileType, write_to_file, load_autonolas_yaml
 from auto_dev.constants import AUTO_DEV_FOLDER, DEFAULT_AGENT_NAME
 from auto_dev.workflow_manager import WorkflowManager
+from auto_dev.services.eject.index import EjectConfig, ComponentEjector
+
+
+@pytest.fixture
+def ejector(test_clean_filesystem):
+    """Component ejector working in an empty agent directory."""
+    assert Path.cwd() == Path(test_clean_filesystem)
+    config = EjectConfig(
+        component_type="skill",
+        public_id=PublicId("valory", "abci", "0.1.0"),
+        fork_id=PublicId("me", "new_abci", "0.1.0"),
+    )
+    return ComponentEjector(config)
+
+
+def write_python_file(path: Path, content: str) -> Path:
+    """Write a python module, creating its package directory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return path
+
+
+def package_id(package_type: PackageType, public_id: str) -> PackageId:
+    """Package id from its type and public id string."""
+    return PackageId(package_type, PublicId.from_str(public_id))
 
 
 def test_eject_metrics_skill_workflow(test_filesystem):
@@ -88,3 +118,238 @@ def test_eject_http_protocol(test_filesystem):
     # Verify dependencies were not ejected (should have same number of vendor components minus one)
     final_vendor_components = list((Path(DEFAULT_AGENT_NAME) / "vendor").rglob("*.yaml"))
     assert len(final_vendor_components) > 1, "Dependencies were incorrectly ejected"
+
+
+def test_update_python_files_prefers_longest_match(ejector):
+    """A package whose name extends another ejected package's name is rewritten to its own new name."""
+    module = write_python_file(
+        Path.cwd() / "skills" / "dependent" / "behaviours.py",
+        "from packages.valory.skills.abci_utils.models import Params\n"
+        "from packages.valory.skills.abci.models import SharedState\n"
+        'PUBLIC_IDS = ("valory/abci_utils:0.1.0", "valory/abci:0.1.0")\n',
+    )
+    ejector.update_python_files(
+        {
+            package_id(PackageType.SKILL, "valory/abci:0.1.0"): package_id(PackageType.SKILL, "me/new_abci:0.1.0"),
+            package_id(PackageType.SKILL, "valory/abci_utils:0.1.0"): package_id(PackageType.SKILL, "me/utils:0.1.0"),
+        }
+    )
+    assert module.read_text() == (
+        "from packages.me.skills.utils.models import Params\n"
+        "from packages.me.skills.new_abci.models import SharedState\n"
+        'PUBLIC_IDS = ("me/utils:0.1.0", "me/new_abci:0.1.0")\n'
+    )
+
+
+def test_update_python_files_renames_protocol_message(ejector):
+    """Protocol message classes are renamed along with the protocol's import path."""
+    module = write_python_file(
+        Path.cwd() / "protocols" / "web_server" / "dialogues.py",
+        "from packages.valory.protocols.http_server.message import HttpServerMessage\n"
+        "MESSAGE_CLASS = HttpServerMessage\n",
+    )
+    ejector.update_python_files(
+        {
+            package_id(PackageType.PROTOCOL, "valory/http_server:1.0.0"): package_id(
+                PackageType.PROTOCOL, "me/web_server:0.1.0"
+            ),
+        }
+    )
+    assert module.read_text() == (
+        "from packages.me.protocols.web_server.message import WebServerMessage\nMESSAGE_CLASS = WebServerMessage\n"
+    )
+
+
+def test_update_python_files_preserves_bytes(ejector):
+    """Sources are rewritten as bytes, keeping line endings and bytes that are not valid utf-8."""
+    module = Path.cwd() / "skills" / "dependent" / "handlers.py"
+    module.parent.mkdir(parents=True)
+    module.write_bytes(b"# caf\xe9\r\nfrom packages.valory.skills.abci.models import SharedState\r\n")
+    ejector.update_python_files(
+        {package_id(PackageType.SKILL, "valory/abci:0.1.0"): package_id(PackageType.SKILL, "me/new_abci:0.1.0")}
+    )
+    assert module.read_bytes() == b"# caf\xe9\r\nfrom packages.me.skills.new_abci.models import SharedState\r\n"
+
+
+def test_update_python_files_leaves_unmatched_files_untouched(ejector):
+    """Files without a reference to an ejected package are neither changed nor rewritten."""
+    content = "from packages.valory.skills.abstract_round_abci.base import AbciApp\n"
+    module = write_python_file(Path.cwd() / "skills" / "dependent" / "rounds.py", content)
+    os.utime(module, ns=(0, 0))
+    ejector.update_python_files(
+        {package_id(PackageType.SKILL, "valory/abci:0.1.0"): package_id(PackageType.SKILL, "me/new_abci:0.1.0")}
+    )
+    assert module.read_text() == content
+    assert module.stat().st_mtime_ns == 0
+
+
+ABCI_HASH = "bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi"
+
+
+def eject_with_overrides(ejector, ejected_components: dict[PackageId, PackageId], overrides: list[dict]) -> list[dict]:
+    """Update all references for the ejected skills, returning the agent's overrides afterwards."""
+    for new_package_id in ejected_components.values():
+        skill_dir = Path.cwd() / "skills" / new_package_id.public_id.name
+        skill_dir.mkdir(parents=True)
+        write_to_file(
+            skill_dir / "skill.yaml",
+            {"name": new_package_id.public_id.name, "author": new_package_id.public_id.author, "skills": []},
+            file_type=FileType.YAML,
+        )
+    agent_config = {"agent_name": "agent", "author": "valory", "skills": ["valory/abci:0.1.0"]}
+    write_to_file(Path.cwd() / "aea-config.yaml", [agent_config, *overrides], file_type=FileType.YAML)
+    ejector.update_all_references(ejected_components)
+    return load_autonolas_yaml(PackageType.AGENT)[1:]
+
+
+@pytest.mark.parametrize(
+    ("ejected_public_id", "override_public_ids", "expected_public_ids"),
+    [
+        # hashed package id, unhashed override
+        (f"valory/abci:0.1.0:{ABCI_HASH}", ["valory/abci:0.1.0"], ["me/new_abci:0.1.0"]),
+        # unhashed package id, hashed override
+        ("valory/abci:0.1.0", [f"valory/abci:0.1.0:{ABCI_HASH}"], ["me/new_abci:0.1.0"]),
+        # two overrides for the same package
+        (
+            "valory/abci:0.1.0",
+            ["valory/abci:0.1.0", f"valory/abci:0.1.0:{ABCI_HASH}"],
+            ["me/new_abci:0.1.0", "me/new_abci:0.1.0"],
+        ),
+        # a package whose name the ejected package's name is a prefix of
+        ("valory/abci:0.1.0", ["valory/abci_utils:0.1.0"], ["valory/abci_utils:0.1.0"]),
+    ],
+)
+def test_update_all_references_overrides(
+    ejector, ejected_public_id: str, override_public_ids: list[str], expected_public_ids: list[str]
+):
+    """Agent overrides of an ejected package point at the new package, and only those."""
+    overrides = eject_with_overrides(
+        ejector,
+        {package_id(PackageType.SKILL, ejected_public_id): package_id(PackageType.SKILL, "me/new_abci:0.1.0")},
+        [{"public_id": public_id, "type": "skill"} for public_id in override_public_ids],
+    )
+    assert [override["public_id"] for override in overrides] == expected_public_ids
+
+
+def test_update_all_references_overrides_match_package_type(ejector):
+    """An override of another package type with the same public id is left alone."""
+    overrides = eject_with_overrides(
+        ejector,
+        {package_id(PackageType.SKILL, "valory/abci:0.1.0"): package_id(PackageType.SKILL, "me/new_abci:0.1.0")},
+        [{"public_id": "valory/abci:0.1.0", "type": "protocol"}],
+    )
+    assert overrides == [{"public_id": "valory/abci:0.1.0", "type": "protocol"}]
+
+
+def test_update_all_references_loads_and_writes_each_config_once(ejector, monkeypatch):
+    """Every config is loaded once for all ejected packages and only changed configs are written back."""
+    configs = {
+        "new_abci": {"name": "new_abci", "author": "me", "skills": []},
+        "new_rounds": {"name": "new_rounds", "author": "me", "skills": [f"valory/abci:0.1.0:{ABCI_HASH}"]},
+    }
+    for name, config in configs.items():
+        (Path.cwd() / "skills" / name).mkdir(parents=True)
+        write_to_file(Path.cwd() / "skills" / name / "skill.yaml", config, file_type=FileType.YAML)
+    write_to_file(Path.cwd() / "aea-config.yaml", [{"agent_name": "agent", "author": "me"}], file_type=FileType.YAML)
+    for config_path in Path.cwd().rglob("*.yaml"):
+        os.utime(config_path, ns=(0, 0))
+
+    loaded_dirs = []
+
+    def recording_load_autonolas_yaml(package_type, directory=None):
+        loaded_dirs.append(Path(directory))
+        return load_autonolas_yaml(package_type, directory)
+
+    monkeypatch.setattr("auto_dev.services.eject.index.load_autonolas_yaml", recording_load_autonolas_yaml)
+    ejector.update_all_references(
+        {
+            package_id(PackageType.SKILL, "valory/abci:0.1.0"): package_id(PackageType.SKILL, "me/new_abci:0.1.0"),
+            package_id(PackageType.SKILL, "valory/rounds:0.1.0"): package_id(PackageType.SKILL, "me/new_rounds:0.1.0"),
+        }
+    )
+
+    assert sorted(loaded_dirs) == sorted(
+        [Path.cwd(), Path.cwd() / "skills" / "new_abci", Path.cwd() / "skills" / "new_rounds"]
+    )
+    new_rounds_path = Path.cwd() / "skills" / "new_rounds" / "skill.yaml"
+    assert load_autonolas_yaml(PackageType.SKILL, new_rounds_path.parent)[0]["skills"] == [
+        f"me/new_abci:0.1.0:{ABCI_HASH}"
+    ]
+    assert new_rounds_path.stat().st_mtime_ns != 0
+    assert (Path.cwd() / "skills" / "new_abci" / "skill.yaml").stat().st_mtime_ns == 0
+    assert (Path.cwd() / "aea-config.yaml").stat().st_mtime_ns == 0
+
+
+def test_write_yaml_files_follows_symlinks_and_keeps_mode(ejector):
+    """A symlinked config stays a symlink and the written file keeps its permissions."""
+    target = Path.cwd() / "configs" / "aea-config.yaml"
+    target.parent.mkdir()
+    write_to_file(target, {"agent_name": "old"}, file_type=FileType.YAML)
+    target.chmod(0o640)
+    link = Path.cwd() / "aea-config.yaml"
+    link.symlink_to(target)
+    ejector._write_yaml_files({link: {"agent_name": "new"}})  # noqa: SLF001
+    assert link.is_symlink()
+    assert target.stat().st_mode & 0o777 == 0o640
+    assert load_autonolas_yaml(PackageType.AGENT) == [{"agent_name": "new"}]
+    assert not list(Path.cwd().rglob("*.tmp"))
+
+
+def test_write_yaml_files_cleans_up_on_failure(ejector, monkeypatch):
+    """No target is touched and no staged file is left behind when writing fails."""
+    config = Path.cwd() / "aea-config.yaml"
+    write_to_file(config, {"agent_name": "old"}, file_type=FileType.YAML)
+    skill_config = Path.cwd() / "skill.yaml"
+
+    def failing_replace(_path, target):
+        msg = f"Cannot replace {target}"
+        raise OSError(msg)
+
+    monkeypatch.setattr(Path, "replace", failing_replace)
+    with pytest.raises(OSError, match="Cannot replace"):
+        ejector._write_yaml_files({config: {"agent_name": "new"}, skill_config: {"name": "skill"}})  # noqa: SLF001
+    assert load_autonolas_yaml(PackageType.AGENT) == [{"agent_name": "old"}]
+    assert not skill_config.exists()
+    assert not list(Path.cwd().rglob("*.tmp"))
+
+
+def test_move_package_directory(test_clean_filesystem):
+    """A vendor package is moved into the agent's packages and never nested into an existing one."""
+    assert Path.cwd() == Path(test_clean_filesystem)
+    src = Path.cwd() / "vendor" / "valory" / "skills" / "abci"
+    write_python_file(src / "behaviours.py", "")
+    dst = Path.cwd() / "skills" / "new_abci"
+    ComponentEjector._move_package_directory(src, dst)  # noqa: SLF001
+    assert not src.exists()
+    assert (dst / "behaviours.py").exists()
+    assert (dst.parent / "__init__.py").exists()
+
+    write_python_file(src / "behaviours.py", "")
+    with pytest.raises(FileExistsError, match="destination already exists"):
+        ComponentEjector._move_package_directory(src, dst)  # noqa: SLF001
+    assert (src / "behaviours.py").exists()
+
+
+def test_update_moved_package_restores_vendor_package_on_failure(test_clean_filesystem, monkeypatch):
+    """A failing config update moves the package back to the vendor with its original files."""
+    assert Path.cwd() == Path(test_clean_filesystem)
+    src = Path.cwd() / "vendor" / "valory" / "skills" / "abci"
+    skill_config = "name: abci\nauthor: valory\nversion: 0.1.0\n"
+    write_python_file(src / "skill.yaml", skill_config)
+    write_python_file(src / "__init__.py", 'PUBLIC_ID = PublicId.from_str("valory/abci:0.1.0")\n')
+    dst = Path.cwd() / "skills" / "new_abci"
+    ComponentEjector._move_package_directory(src, dst)  # noqa: SLF001
+
+    def failing_update_item_config(_item_type, package_path, _config_class, **_kwargs):
+        (package_path / "skill.yaml").write_text("name: abci\nauthor: me\n")
+        msg = "Cannot update skill.yaml"
+        raise ValueError(msg)
+
+    monkeypatch.setattr("auto_dev.services.eject.index.update_item_config", failing_update_item_config)
+    with pytest.raises(ValueError, match="Cannot update skill.yaml"):
+        ComponentEjector._update_moved_package(  # noqa: SLF001
+            "skill", src, dst, PublicId("me", "new_abci", "0.1.0")
+        )
+    assert not dst.exists()
+    assert (src / "skill.yaml").read_text() == skill_config
+    assert (src / "__init__.py").exists()
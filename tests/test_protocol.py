@@ -73,6 +73,49 @@ def test_protodantic(proto_path: Path):
         assert exit_code == 0
 
 
+def test_protodantic_create_many():
+    """Test protodantic.create_many with several .proto files in one batch."""
+
+    proto_paths = [
+        PROTO_FILES["primitives.proto"],
+        PROTO_FILES["basic_enum.proto"],
+        PROTO_FILES["simple_message.proto"],
+        PROTO_FILES["map_nested.proto"],
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        (tmp_path / "__init__.py").touch()
+        specs = [
+            (proto_path, tmp_path / f"{proto_path.stem}_models.py", tmp_path / f"test_{proto_path.stem}_models.py")
+            for proto_path in proto_paths
+        ]
+        protodantic.create_many(specs)
+        expected = {"__init__.py", "primitives.py", "primitive_strategies.py"}
+        for proto_path, code_out, test_out in specs:
+            expected |= {f"{proto_path.stem}_pb2.py", code_out.name, test_out.name}
+        assert {path.name for path in tmp_path.iterdir() if path.is_file()} == expected
+        exit_code = pytest.main([tmp_dir, "-vv", "-s", "--tb=long", "-p", "no:warnings"])
+        assert exit_code == 0
+
+
+def test_protodantic_create_many_protoc_failure():
+    """Test protodantic.create_many leaves no output behind when one protoc batch fails."""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        proto_path = tmp_path / "broken.proto"
+        proto_path.write_text('syntax = "proto3";\n\nmessage Broken {\n  int32 first = 1;\n  int32 second = 1;\n}\n')
+        out_dir = tmp_path / "out"
+        out_dir.mkdir()
+        specs = [
+            (PROTO_FILES["primitives.proto"], out_dir / "models.py", out_dir / "test_models.py"),
+            (proto_path, out_dir / "broken_models.py", out_dir / "test_broken_models.py"),
+        ]
+        with pytest.raises(subprocess.CalledProcessError):
+            protodantic.create_many(specs)
+        assert list(out_dir.iterdir()) == []
+
+
 @pytest.mark.parametrize(
     ("annotation", "expected"),
     [
@@ -89,6 +132,8 @@ def test_protodantic(proto_path: Path):
             "pt:optional[pt:dict[pt:union[pt:str, pt:int], pt:list[pt:union[pt:float, pt:bool]]]]",
             "Optional[dict[str | conint(ge=Int32.min(), le=Int32.max()), tuple[confloat(ge=Double.min(), le=Double.max()) | bool]]]",  # noqa: E501
         ),
+        ("pt:dict[pt:str, pt:union[ct:DataModel, pt:bool]]", "dict[str, DataModel | bool]"),
+        ("pt:optional[ct:DataModel]", "Optional[DataModel]"),
     ],
 )
 def test_parse_performative_annotation(annotation: str, expected: str):
@@ -96,6 +141,37 @@ def test_parse_performative_annotation(annotation: str, expected: str):
     assert performatives.parse_annotation(annotation) == expected
 
 
+@pytest.mark.parametrize(
+    ("annotation", "match"),
+    [
+        ("int", "Unknown annotation prefix"),
+        ("pt:decimal", "Unknown scalar 'decimal'"),
+        ("pt:set[pt:int]", "Unknown container type 'set'"),
+        ("pt:list[pt:int", "Malformed annotation"),
+        ("pt:dict[pt:int]", "Wrong number of arguments for 'dict'"),
+        ("pt:dict[pt:str, pt:int, pt:bool]", "Wrong number of arguments for 'dict'"),
+        ("pt:list[pt:int, pt:str]", "Wrong number of arguments for 'list'"),
+        ("pt:optional[pt:int, pt:str]", "Wrong number of arguments for 'optional'"),
+        ("pt:union[pt:int]", "Wrong number of arguments for 'union'"),
+        ("pt:list[]", "Empty argument"),
+        ("pt:union[]", "Empty argument"),
+        ("pt:list[pt:int,]", "Empty argument"),
+        ("pt:optional[pt:int,]", "Empty argument"),
+        ("pt:list[,pt:int]", "Empty argument"),
+        ("pt:dict[pt:str,,pt:int]", "Empty argument"),
+        ("pt:union[pt:int,,pt:str]", "Empty argument"),
+        ("pt:list[[pt:int]]", "Unexpected '\\['"),
+        ("[pt:int]", "Unexpected '\\['"),
+        ("pt:dict[pt:list[pt:int]pt:str]", "Missing ','"),
+        ("pt:int,", "Malformed annotation"),
+    ],
+)
+def test_parse_performative_annotation_invalid(annotation: str, match: str):
+    """Test parse_performative_annotation rejects invalid annotations."""
+    with pytest.raises(ValueError, match=match):
+        performatives.parse_annotation(annotation)
+
+
 @pytest.mark.parametrize(
     "protocol_spec",
     [